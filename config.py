@@ -2,11 +2,23 @@
 Configuration file for u2b - YouTube Command Line Player
 """
 
+from importlib.util import find_spec
+
 # Default settings
 DEFAULT_VOLUME = 50
 DEFAULT_AUDIO_ONLY = True
 MAX_SEARCH_RESULTS = 10
 
+# REPL line history (unused where readline is unavailable, e.g. Windows)
+HISTORY_FILE = '~/.u2b_history'
+HISTORY_LENGTH = 200
+
+# Resolved stream cache. YouTube stream URLs are signed for the resolving
+# client and expire, so entries are short-lived and only kept in memory;
+# queued tracks older than this are re-resolved before they play
+STREAM_CACHE_SIZE = 128
+STREAM_CACHE_TTL = 5 * 60  # seconds
+
 # FFmpeg settings
 FFMPEG_AUDIO_OPTIONS = [
     '-nodisp',      # No video display for audio-only
@@ -14,7 +26,12 @@ FFMPEG_AUDIO_OPTIONS = [
     '-hide_banner', # Hide FFmpeg banner
     '-loglevel', 'error',  # Only show errors
     '-nostats',     # Don't show statistics
-    '-sync', 'ext'  # External clock sync for better timing
+    '-fflags', 'nobuffer',       # Don't buffer input before decoding
+    '-flags', 'low_delay',       # Low-latency decoding
+    '-probesize', '32k',         # Small probe that still identifies piped input
+    '-analyzeduration', '0',     # Start as soon as the first packet decodes
+    '-af', 'aresample=async=1',  # Keep drift bounded without external clock sync
+    '-protocol_whitelist', 'file,http,https,tcp,tls,crypto,pipe'
 ]
 
 FFMPEG_VIDEO_OPTIONS = [
@@ -23,20 +40,18 @@ FFMPEG_VIDEO_OPTIONS = [
     '-loglevel', 'error'  # Only show errors
 ]
 
-# YouTube search settings
-YOUTUBE_SEARCH_OPTIONS = {
-    'quiet': True,
-    'no_warnings': True,
-    'extract_flat': True,
-    'default_search': 'ytsearch',
-    'max_downloads': MAX_SEARCH_RESULTS,
-    'http_headers': {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        'Accept-Language': 'en-us,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate',
-        'Connection': 'keep-alive',
-    },
+# Constant ffplay argv prefixes; only volume and input are appended per track
+FFMPEG_AUDIO_CMD = ('ffplay', *FFMPEG_AUDIO_OPTIONS)
+FFMPEG_VIDEO_CMD = ('ffplay', *FFMPEG_VIDEO_OPTIONS)
+
+# HTTP headers sent with every yt-dlp request
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-us,en;q=0.5',
+    # Brotli is only advertised when a decoder is installed
+    'Accept-Encoding': 'br, gzip' if find_spec('brotli') or find_spec('brotlicffi') else 'gzip, deflate',
+    'Connection': 'keep-alive',
 }
 
 # Supported video formats (priority order)
@@ -53,6 +68,36 @@ VIDEO_FORMATS = [
     'best'
 ]
 
+# YouTube search settings (search_youtube also passes process=False to
+# extract_info, which is a call argument rather than a YoutubeDL option)
+YOUTUBE_SEARCH_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist',
+    'skip_download': True,
+    'default_search': 'ytsearch',
+    'playlistend': MAX_SEARCH_RESULTS,
+    'extractor_args': {
+        'youtube': {
+            'player_skip': ['configs', 'webpage'],
+            'skip': ['hls', 'dash', 'translated_subs'],
+        },
+    },
+    'http_headers': HTTP_HEADERS,
+}
+
+# Stream URL resolution settings (audio-only and video playback)
+YOUTUBE_STREAM_AUDIO_OPTIONS = {
+    'format': '/'.join(AUDIO_FORMATS + ['best[acodec!=none]', 'best']),
+    'quiet': True,
+    'no_warnings': True,
+    'extractaudio': False,
+    'outtmpl': '-',
+    'http_headers': HTTP_HEADERS,
+}
+
+YOUTUBE_STREAM_VIDEO_OPTIONS = dict(YOUTUBE_STREAM_AUDIO_OPTIONS, format='/'.join(VIDEO_FORMATS))
+
 # Color settings for terminal output
 COLORS = {
     'success': 'green',
@@ -8,6 +8,14 @@ import subprocess
 import sys
 import os
 import platform
+import shutil
+import hashlib
+import re
+
+# Resolved next to this script so install.py works from any directory
+REQUIREMENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'requirements.txt')
+# Hash of requirements.txt as of the last successful pip install
+REQUIREMENTS_SENTINEL = os.path.join(os.path.dirname(REQUIREMENTS_FILE), '.requirements.sha256')
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -19,14 +27,10 @@ def check_python_version():
 
 def check_ffmpeg():
     """Check if FFmpeg is installed"""
-    try:
-        result = subprocess.run(['ffplay', '-version'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            print("✓ FFmpeg detected")
-            return True
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        pass
+    path = shutil.which('ffplay')
+    if path:
+        print(f"✓ FFmpeg detected at {path}")
+        return True
     
     print("✗ FFmpeg not found")
     print("\nPlease install FFmpeg:")
@@ -44,11 +48,74 @@ def check_ffmpeg():
     
     return False
 
+def _parse_version(version):
+    """Turn a version string like '2024.12.09' into a comparable tuple"""
+    parts = []
+    for part in version.split('.'):
+        match = re.match(r'\d+', part)
+        if not match:
+            break
+        parts.append(int(match.group()))
+    return tuple(parts)
+
+def _requirements_hash():
+    """SHA-256 of requirements.txt"""
+    with open(REQUIREMENTS_FILE, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def requirements_satisfied():
+    """Check installed package versions against requirements.txt without running pip"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:  # Python 3.7
+        return False
+    
+    # Specifiers we can't compare are trusted only if requirements.txt is
+    # unchanged since the last successful install
+    try:
+        with open(REQUIREMENTS_SENTINEL) as f:
+            unchanged = f.read().strip() == _requirements_hash()
+    except OSError:
+        unchanged = False
+    
+    try:
+        with open(REQUIREMENTS_FILE) as f:
+            lines = f.readlines()
+    except OSError:
+        # Let pip run and report the problem
+        return False
+    
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        match = re.match(r'^([A-Za-z0-9_.-]+)\s*(?:(==|>=)\s*([^\s;,]+))?$', line)
+        if not match:
+            if unchanged:
+                continue
+            return False
+        name, op, wanted = match.groups()
+        try:
+            installed = _parse_version(version(name))
+        except PackageNotFoundError:
+            return False
+        if op == '==' and installed != _parse_version(wanted):
+            return False
+        if op == '>=' and installed < _parse_version(wanted):
+            return False
+    return True
+
 def install_python_packages():
     """Install required Python packages"""
+    if requirements_satisfied():
+        print("✓ Python packages already installed")
+        return True
+    
     try:
         print("Installing Python packages...")
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', 'requirements.txt'])
+        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', REQUIREMENTS_FILE])
+        with open(REQUIREMENTS_SENTINEL, 'w') as f:
+            f.write(_requirements_hash())
         print("✓ Python packages installed successfully")
         return True
     except subprocess.CalledProcessError as e:
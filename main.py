@@ -4,37 +4,281 @@ u2b - Lightweight YouTube Desktop Command Line App
 A simple CLI tool for searching and playing YouTube videos with audio-only support.
 """
 
+import io
 import os
 import sys
+import tempfile
 import subprocess
 import re
+import shutil
+import signal
 import json
 import threading
 import time
-from urllib.parse import urlparse, parse_qs
-import requests
-from bs4 import BeautifulSoup
-import yt_dlp
+import atexit
+import functools
+from collections import OrderedDict, deque
+from queue import SimpleQueue
+from concurrent.futures import Future, CancelledError
 from colorama import init, Fore, Style
 import config
 
-# Initialize colorama for cross-platform colored output
-init()
+try:
+    import readline  # Line editing and history for input()
+except ImportError:  # Not available on Windows
+    readline = None
+
+# Video ID from any YouTube URL shape (watch, youtu.be, embed, shorts, v),
+# anchored to the scheme and host so lookalike domains don't match
+_YT_ID_RE = re.compile(r'^(?:https?://)?(?:[\w-]+\.)?(?:youtu\.be/|youtube\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|v/))([A-Za-z0-9_-]{11})')
+
+# yt-dlp pulls in hundreds of extractor modules, so it is imported on first use
+_YTDLP = None
+
+def _get_ytdlp():
+    """Import yt-dlp on first use and cache the module"""
+    global _YTDLP
+    if _YTDLP is None:
+        import yt_dlp
+        _YTDLP = yt_dlp
+    return _YTDLP
+
+# Colored output helpers; each message carries its own reset
+_RED = Fore.RED
+_YELLOW = Fore.YELLOW
+_CYAN = Fore.CYAN
+_GREEN = Fore.GREEN
+_RST = Style.RESET_ALL
+
+def _err(msg):
+    """Print an error in red"""
+    print(f"{_RED}{msg}{_RST}")
+
+def _warn(msg):
+    """Print a warning in yellow"""
+    print(f"{_YELLOW}{msg}{_RST}")
+
+def _info(msg):
+    """Print an informational message in cyan"""
+    print(f"{_CYAN}{msg}{_RST}")
+
+def _ok(msg):
+    """Print a success message in green"""
+    print(f"{_GREEN}{msg}{_RST}")
+
+# Bytes of ffplay's stderr shown when a track fails
+_STDERR_TAIL = 4096
+
+if readline is not None and sys.stdin.isatty() and sys.stdout.isatty():
+    # input() hands the prompt to readline, which must be told that the
+    # escape codes take no columns or it misplaces the cursor when editing
+    _PROMPT = f"\001{_GREEN}\002u2b> \001{_RST}\002"
+else:
+    _PROMPT = f"{_GREEN}u2b> {_RST}"
+_GREEN_IDX = [f"{_GREEN}{i:2d}.{_RST}" for i in range(1, config.MAX_SEARCH_RESULTS + 1)]
+
+_HELP_TEXT = f"""
+{_CYAN}u2b - YouTube Command Line Player{_RST}
+
+{_GREEN}Commands:{_RST}
+  <search term>     - Search and add to queue (or play if nothing is playing)
+  <youtube url>     - Add YouTube URL to queue (or play if nothing is playing)
+  volume <1-100>    - Set volume level
+  stop              - Stop current playback
+  queue             - Show current queue
+  clear             - Clear the queue
+  skip              - Skip current track
+  help              - Show this help
+  quit/exit         - Exit the application
+
+{_YELLOW}Examples:{_RST}
+  never gonna give you up
+  https://www.youtube.com/watch?v=dQw4w9WgXcQ
+  volume 75
+  queue
+  skip
+  clear
+
+{_CYAN}Features:{_RST}
+  - Audio-only playback (no ads)
+  - Smart queue system
+  - Volume control (1-100)
+  - Direct URL support
+  - Search functionality
+  - Continuous playback
+
+"""
+
+def _init_colors():
+    """Initialize colorama for cross-platform colored output"""
+    # POSIX terminals understand ANSI codes natively; colorama's stdout
+    # wrapper is only needed for the Windows console, or to strip the codes
+    # when output is redirected
+    if sys.platform == 'win32' or not sys.stdout.isatty():
+        init()
+
+class _SpawnedProcess:
+    """Minimal subprocess.Popen stand-in for a child started with os.posix_spawn"""
+    
+    def __init__(self, pid, args, stdin=None):
+        self.pid = pid
+        self.args = args
+        self.stdin = stdin
+        self.stdout = None
+        self.stderr = None
+        self.returncode = None
+        self._exited = threading.Event()
+    
+    def _reap(self, flags):
+        """waitpid() the child and record its return code once it has exited"""
+        try:
+            pid, status = os.waitpid(self.pid, flags)
+        except ChildProcessError:
+            # Another thread reaped the child and is recording its status
+            if not flags & os.WNOHANG:
+                self._exited.wait()
+            return self.returncode
+        if pid:
+            self.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            self._exited.set()
+        return self.returncode
+    
+    def poll(self):
+        if self.returncode is None:
+            self._reap(os.WNOHANG)
+        return self.returncode
+    
+    def wait(self, timeout=None):
+        if timeout is None:
+            if self.returncode is None:
+                self._reap(0)
+            return self.returncode
+        
+        deadline = time.monotonic() + timeout
+        while self.poll() is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            self._exited.wait(min(remaining, 0.05))
+        return self.returncode
+    
+    def send_signal(self, sig):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass  # Already exited, not yet reaped
+    
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+    
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
 
 class U2BPlayer:
     def __init__(self):
         self.volume = config.DEFAULT_VOLUME
+        self._volume_str = str(self.volume)
         self.current_process = None
-        self.is_playing = False
-        self.queue = []
+        self._autoplay = False  # Advance through the queue when a track ends
+        self.queue = deque()
         self.current_track = None
         self.queue_lock = threading.Lock()
+        # One long-lived thread waits on each started ffplay in turn
         self.player_thread = None
+        self._monitor_jobs = SimpleQueue()
         self.ffplay_path = self._find_ffplay()
+        # Constant ffplay argv prefixes, as tuples so each track only appends its tail
+        ffplay = self.ffplay_path or config.FFMPEG_AUDIO_CMD[0]
+        self._ffplay_cmd = (ffplay,) + config.FFMPEG_AUDIO_CMD[1:]
+        self._ffplay_video_cmd = (ffplay,) + config.FFMPEG_VIDEO_CMD[1:]
+        # yt-dlp instances per option profile, built on first use and reused
+        # for every call: kind -> (YoutubeDL, lock held while it is in use)
+        self._ydls = {}
+        self._ydl_lock = threading.Lock()
+        self._closing = False
+        # Resolved info per (video_id, audio_only): (info, fetched_at), oldest first
+        self._stream_cache = OrderedDict()
+        self._stream_cache_lock = threading.Lock()
+        self._devnull_fd = None
+        self._http = None  # requests.Session for direct stream fetches
+        # Stream resolution for the top search result runs on this daemon
+        # thread, ahead of playback, so quitting never waits on an extraction
+        self._prefetch_thread = None
+        self._prefetch_jobs = SimpleQueue()
+        self._prefetch_futures = []
+    
+    _YDL_OPTIONS = {
+        'search': config.YOUTUBE_SEARCH_OPTIONS,
+        'stream_audio': config.YOUTUBE_STREAM_AUDIO_OPTIONS,
+        'stream_video': config.YOUTUBE_STREAM_VIDEO_OPTIONS,
+    }
+    
+    def _ydl_call(self, kind, fn):
+        """Run fn(ydl) on the shared YoutubeDL instance for an option profile, creating it on first use"""
+        with self._ydl_lock:
+            if self._closing:
+                raise RuntimeError("Player is closed")
+            if kind not in self._ydls:
+                self._ydls[kind] = (_get_ytdlp().YoutubeDL(self._YDL_OPTIONS[kind]), threading.Lock())
+            ydl, lock = self._ydls[kind]
+        # YoutubeDL isn't documented as thread-safe, so calls on one instance
+        # (main thread, prefetch worker, monitor) take turns
+        with lock:
+            if self._closing:
+                raise RuntimeError("Player is closed")
+            try:
+                return fn(ydl)
+            finally:
+                if self._closing:
+                    ydl.close()  # close() skipped it while we were using it
+    
+    def close(self):
+        """Stop playback and release the cached yt-dlp instances"""
+        self._closing = True
+        self.stop_playback()
+        self.cancel_prefetch()
+        if self._prefetch_thread is not None:
+            self._prefetch_jobs.put(None)
+        with self._ydl_lock:
+            ydls, self._ydls = self._ydls, {}
+        for ydl, lock in ydls.values():
+            # An instance still extracting is closed by its caller when done
+            if lock.acquire(blocking=False):
+                ydl.close()
+                lock.release()
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+        if self._devnull_fd is not None:
+            os.close(self._devnull_fd)
+            self._devnull_fd = None
+    
+    def _prefetch(self, fn, *args):
+        """Run fn(*args) on the prefetch worker, starting it on first use; returns a Future"""
+        if self._prefetch_thread is None:
+            self._prefetch_thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._prefetch_thread.start()
+        future = Future()
+        self._prefetch_jobs.put((future, fn, args))
+        return future
+    
+    def _prefetch_loop(self):
+        """Run queued prefetches until close()"""
+        while True:
+            job = self._prefetch_jobs.get()
+            if job is None or self._closing:
+                break
+            future, fn, args = job
+            if not future.set_running_or_notify_cancel():
+                continue  # Cancelled while queued
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
     
     def _find_ffplay(self):
         """Find ffplay executable in PATH or common locations"""
-        import shutil
         # First try to find it in PATH
         ffplay_path = shutil.which('ffplay')
         if ffplay_path:
@@ -84,15 +328,15 @@ class U2BPlayer:
     def _check_ffplay(self):
         """Check if ffplay is available"""
         if not self.ffplay_path:
-            print(f"{Fore.RED}ERROR: ffplay not found!{Style.RESET_ALL}")
-            print(f"{Fore.YELLOW}FFmpeg is required to play audio/video.{Style.RESET_ALL}")
-            print(f"\n{Fore.CYAN}To install FFmpeg on Windows:{Style.RESET_ALL}")
+            _err("ERROR: ffplay not found!")
+            _warn("FFmpeg is required to play audio/video.")
+            _info("\nTo install FFmpeg on Windows:")
             print("1. Download from: https://www.gyan.dev/ffmpeg/builds/")
             print("   (or https://ffmpeg.org/download.html)")
             print("2. Extract to C:\\ffmpeg")
             print("3. Add C:\\ffmpeg\\bin to your system PATH")
             print("4. Restart your command prompt")
-            print(f"\n{Fore.CYAN}Or use chocolatey:{Style.RESET_ALL}")
+            _info("\nOr use chocolatey:")
             print("  choco install ffmpeg")
             return False
         return True
@@ -100,109 +344,165 @@ class U2BPlayer:
     def search_youtube(self, query):
         """Search YouTube for videos"""
         try:
-            # Use yt-dlp to search for videos
-            with yt_dlp.YoutubeDL(config.YOUTUBE_SEARCH_OPTIONS) as ydl:
-                results = ydl.extract_info(f"ytsearch{config.MAX_SEARCH_RESULTS}:{query}", download=False)
-                
-            if 'entries' in results:
-                return results['entries']
-            return []
+            # Use yt-dlp to search for videos. process=False returns the raw
+            # flat entries without running each through yt-dlp's result
+            # processing; they are resolved on play
+            search = f"ytsearch{config.MAX_SEARCH_RESULTS}:{query}"
+            results = self._ydl_call('search', lambda ydl: ydl.extract_info(search, download=False, process=False))
+            
+            if not results or 'entries' not in results:
+                return []
+            entries = list(results['entries'])
+            
+            # Resolve the top result, the one main() plays, in the background;
+            # play_video picks up the future instead of starting over
+            self.cancel_prefetch()
+            if entries:
+                future = self._prefetch(self._resolve_stream_url, dict(entries[0]))
+                entries[0]['_prefetch'] = future
+                self._prefetch_futures.append(future)
+            return entries
         except Exception as e:
-            print(f"{Fore.RED}Error searching YouTube: {e}{Style.RESET_ALL}")
+            _err(f"Error searching YouTube: {e}")
             return []
     
-    def extract_video_id(self, url):
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def extract_video_id(url):
         """Extract video ID from YouTube URL"""
-        if 'youtube.com' in url or 'youtu.be' in url:
-            if 'youtu.be' in url:
-                return url.split('/')[-1].split('?')[0]
-            elif 'youtube.com/watch' in url:
-                parsed_url = urlparse(url)
-                query_params = parse_qs(parsed_url.query)
-                return query_params.get('v', [None])[0]
-        return None
+        m = _YT_ID_RE.match(url)
+        return m.group(1) if m else None
     
     def get_video_info(self, video_id_or_url):
         """Get video information"""
+        # Stream resolution returns the full metadata too, and shares its
+        # YoutubeDL instance and caches with playback
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-us,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                },
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(video_id_or_url, download=False)
-                return info
+            return self._resolve_stream_url(video_id_or_url)
         except Exception as e:
-            print(f"{Fore.RED}Error getting video info: {e}{Style.RESET_ALL}")
+            _err(f"Error getting video info: {e}")
             return None
     
-    def play_video(self, video_id_or_url, audio_only=True, add_to_queue=False):
-        """Play video with specified options"""
+    def _cache_get(self, key):
+        """Return cached info for key, or None if missing or expired"""
+        with self._stream_cache_lock:
+            entry = self._stream_cache.get(key)
+            if entry is None:
+                return None
+            info, fetched_at = entry
+            if time.monotonic() - fetched_at > config.STREAM_CACHE_TTL:
+                del self._stream_cache[key]
+                return None
+            self._stream_cache.move_to_end(key)
+            return info
+    
+    def _cache_put(self, key, info):
+        """Cache resolved info, evicting the least recently used entry when full"""
+        with self._stream_cache_lock:
+            self._stream_cache[key] = (info, time.monotonic())
+            self._stream_cache.move_to_end(key)
+            if len(self._stream_cache) > config.STREAM_CACHE_SIZE:
+                self._stream_cache.popitem(last=False)
+    
+    def _resolve_stream_url(self, video, audio_only=True, fresh=False):
+        """Resolve a URL or search entry to its info dict, including the direct stream URL
+        
+        fresh=True bypasses the caches, e.g. when a stored stream URL has expired.
+        """
+        is_entry = isinstance(video, dict)
+        if is_entry:
+            future = video.get('_prefetch')
+            if future is not None:
+                # Prefetches resolve with the default audio-only profile
+                if audio_only and not fresh:
+                    try:
+                        return future.result()
+                    except CancelledError:
+                        pass  # Superseded before it started; resolve it now
+                video = {k: v for k, v in video.items() if k != '_prefetch'}
+        video_id = video.get('id') if is_entry else self.extract_video_id(video)
+        key = (video_id, audio_only)
+        if video_id and not fresh:
+            info = self._cache_get(key)
+            if info:
+                return info
+        
+        if is_entry:
+            # The entry already names its extractor, so skip URL matching
+            extract = lambda ydl: ydl.process_ie_result(dict(video), download=False)
+        else:
+            extract = lambda ydl: ydl.extract_info(video, download=False)
+        info = self._ydl_call('stream_audio' if audio_only else 'stream_video', extract)
+        if info:
+            info['_fetched_at'] = time.monotonic()
+            if video_id:
+                self._cache_put(key, info)
+        return info
+    
+    def cancel_prefetch(self):
+        """Cancel search-result prefetches that haven't started yet"""
+        for future in self._prefetch_futures:
+            future.cancel()
+        self._prefetch_futures = []
+    
+    def play_video(self, video, audio_only=True, add_to_queue=False):
+        """Play a YouTube URL or search entry with specified options"""
         try:
-            # Get video info first
-            ydl_opts = {
-                'format': 'bestaudio[ext=m4a]/bestaudio[ext=mp3]/bestaudio[ext=webm]/bestaudio/best[acodec!=none]/best' if audio_only else 'best[height<=720]/best[height<=480]/best',
-                'quiet': True,
-                'no_warnings': True,
-                'extractaudio': False,
-                'outtmpl': '-',
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-us,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                },
-            }
-            
             # Get video info
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(video_id_or_url, download=False)
-            
-            if not info:
-                print(f"{Fore.RED}Could not get video information{Style.RESET_ALL}")
-                return False
-            
-            # If something is already playing and we're not explicitly adding to queue
-            if self.is_playing and not add_to_queue:
-                # Add to queue instead of stopping current track
-                self.add_to_queue(info)
-                return True
-            
-            # If nothing is playing, start playing immediately
-            if not self.is_playing:
-                self.current_track = info
-                self._play_track(info)
-                return True
-            
-            # If we're explicitly adding to queue
-            if add_to_queue:
-                self.add_to_queue(info)
-                return True
-            
-            return True
-            
+            info = self._resolve_stream_url(video, audio_only)
         except Exception as e:
-            print(f"{Fore.RED}Error playing video: {e}{Style.RESET_ALL}")
+            _err(f"Error playing video: {e}")
             return False
+        return self.play_info(info, add_to_queue)
     
-    def stop_playback(self):
-        """Stop currently playing video"""
-        self.is_playing = False  # Set this first to prevent auto-play next
-        if self.current_process and self.current_process.poll() is None:
-            self.current_process.terminate()
+    def play_info(self, info, add_to_queue=False):
+        """Play an already resolved video, or queue it if something is playing"""
+        if not info:
+            _err("Could not get video information")
+            return False
+        
+        # If something is already playing and we're not explicitly adding to queue
+        if self.is_playing and not add_to_queue:
+            # Add to queue instead of stopping current track
+            self.add_to_queue(info)
+            return True
+        
+        # If nothing is playing, start playing immediately
+        if not self.is_playing:
+            self.current_track = info
+            self._play_track(info)
+            return True
+        
+        # If we're explicitly adding to queue
+        if add_to_queue:
+            self.add_to_queue(info)
+            return True
+        
+        return True
+    
+    @property
+    def is_playing(self):
+        """Whether an ffplay process is currently running"""
+        process = self.current_process
+        return process is not None and process.poll() is None
+    
+    def _terminate(self, process):
+        """Stop a process, escalating to kill if it ignores SIGTERM"""
+        process.terminate()
+        try:
+            process.wait(timeout=0.3)
+        except subprocess.TimeoutExpired:
+            process.kill()  # Force kill if it doesn't terminate
             try:
-                self.current_process.wait(timeout=2)  # Wait up to 2 seconds
+                process.wait(timeout=0.3)
             except subprocess.TimeoutExpired:
-                self.current_process.kill()  # Force kill if it doesn't terminate
+                pass  # Unkillable for now (e.g. stuck in the kernel); don't block stop/close on it
+    
+    def stop_playback(self):
+        """Stop currently playing video"""
+        self._autoplay = False  # Set this first to prevent auto-play next
+        if self.is_playing:
+            self._terminate(self.current_process)
         self.current_process = None
         self.current_track = None
     
@@ -210,23 +510,24 @@ class U2BPlayer:
         """Set volume level (1-100)"""
         if 1 <= volume <= 100:
             self.volume = volume
-            print(f"{Fore.YELLOW}Volume set to: {volume}%{Style.RESET_ALL}")
+            self._volume_str = str(volume)
+            _warn(f"Volume set to: {volume}%")
         else:
-            print(f"{Fore.RED}Volume must be between 1 and 100{Style.RESET_ALL}")
+            _err("Volume must be between 1 and 100")
     
     def add_to_queue(self, video_info):
         """Add a video to the queue"""
         with self.queue_lock:
             self.queue.append(video_info)
-            print(f"{Fore.CYAN}Added to queue: {video_info.get('title', 'Unknown')}{Style.RESET_ALL}")
-            print(f"{Fore.CYAN}Queue length: {len(self.queue)}{Style.RESET_ALL}")
+            _info(f"Added to queue: {video_info.get('title', 'Unknown')}")
+            _info(f"Queue length: {len(self.queue)}")
     
     def get_queue_info(self):
         """Get current queue information"""
         with self.queue_lock:
             return {
                 'current': self.current_track,
-                'queue': self.queue.copy(),
+                'queue': list(self.queue),
                 'length': len(self.queue)
             }
     
@@ -234,44 +535,43 @@ class U2BPlayer:
         """Display current queue"""
         queue_info = self.get_queue_info()
         
-        print(f"\n{Fore.CYAN}=== Current Queue ==={Style.RESET_ALL}")
+        buf = io.StringIO()
+        buf.write(f"\n{_CYAN}=== Current Queue ==={_RST}\n")
         
         if queue_info['current']:
-            print(f"{Fore.GREEN}▶ Now Playing: {queue_info['current'].get('title', 'Unknown')}{Style.RESET_ALL}")
+            buf.write(f"{_GREEN}▶ Now Playing: {queue_info['current'].get('title', 'Unknown')}{_RST}\n")
         else:
-            print(f"{Fore.YELLOW}⏸ Nothing currently playing{Style.RESET_ALL}")
+            buf.write(f"{_YELLOW}⏸ Nothing currently playing{_RST}\n")
         
         if queue_info['queue']:
-            print(f"\n{Fore.CYAN}Up Next:{Style.RESET_ALL}")
+            buf.write(f"\n{_CYAN}Up Next:{_RST}\n")
             for i, track in enumerate(queue_info['queue'], 1):
                 duration = track.get('duration', 'Unknown')
-                print(f"  {i}. {track.get('title', 'Unknown')} ({duration}s)")
+                buf.write(f"  {i}. {track.get('title', 'Unknown')} ({duration}s)\n")
         else:
-            print(f"{Fore.YELLOW}  Queue is empty{Style.RESET_ALL}")
+            buf.write(f"{_YELLOW}  Queue is empty{_RST}\n")
+        
+        # One write for the whole queue instead of a print per line
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
     
     def clear_queue(self):
         """Clear the queue"""
         with self.queue_lock:
             self.queue.clear()
-            print(f"{Fore.YELLOW}Queue cleared{Style.RESET_ALL}")
+            _warn("Queue cleared")
     
     def skip_current(self):
         """Skip current track and play next in queue"""
-        if self.current_process and self.current_process.poll() is None:
+        if self.is_playing:
             # Temporarily disable auto-play next to prevent double-triggering
-            was_playing = self.is_playing
-            self.is_playing = False
-            
-            self.current_process.terminate()
-            try:
-                self.current_process.wait(timeout=2)
-            except subprocess.TimeoutExpired:
-                self.current_process.kill()
+            was_playing = self._autoplay
+            self._autoplay = False
             
-            print(f"{Fore.YELLOW}Skipped current track{Style.RESET_ALL}")
+            # Returns once the process has been reaped
+            self._terminate(self.current_process)
             
-            # Small delay to ensure process is fully terminated
-            time.sleep(0.5)
+            _warn("Skipped current track")
             
             # Manually trigger next song
             if was_playing:
@@ -280,14 +580,15 @@ class U2BPlayer:
     def play_next_in_queue(self):
         """Play the next track in the queue"""
         with self.queue_lock:
-            if self.queue:
-                next_track = self.queue.pop(0)
-                self.current_track = next_track
-                self._play_track(next_track)
-            else:
-                self.current_track = None
-                self.is_playing = False
-                print(f"{Fore.YELLOW}Queue finished{Style.RESET_ALL}")
+            next_track = self.queue.popleft() if self.queue else None
+            self.current_track = next_track
+        
+        # Played outside the lock: a failing track re-enters this method
+        if next_track is not None:
+            self._play_track(next_track)
+        else:
+            self._autoplay = False
+            _warn("Queue finished")
     
     def _play_track(self, video_info):
         """Internal method to play a track"""
@@ -296,108 +597,256 @@ class U2BPlayer:
             if not self._check_ffplay():
                 return
             
-            print(f"{Fore.GREEN}Now playing: {video_info.get('title', 'Unknown')}{Style.RESET_ALL}")
-            print(f"{Fore.CYAN}Duration: {video_info.get('duration', 'Unknown')} seconds{Style.RESET_ALL}")
-            
-            # Configure yt-dlp options for streaming
-            ydl_opts = {
-                'format': 'bestaudio[ext=m4a]/bestaudio[ext=mp3]/bestaudio[ext=webm]/bestaudio/best[acodec!=none]/best',
-                'quiet': True,
-                'no_warnings': True,
-                'extractaudio': False,
-                'outtmpl': '-',
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-us,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                },
-            }
+            _ok(f"Now playing: {video_info.get('title', 'Unknown')}")
+            _info(f"Duration: {video_info.get('duration', 'Unknown')} seconds")
             
-            # Get the direct URL
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(video_info['webpage_url'], download=False)
+            # Queued tracks were resolved when added; re-resolve them once
+            # they're older than the stream cache would keep them
+            info = video_info
+            if not info.get('url') or time.monotonic() - info.get('_fetched_at', float('-inf')) > config.STREAM_CACHE_TTL:
+                audio_only = video_info.get('vcodec') in (None, 'none')
+                info = self._resolve_stream_url(video_info['webpage_url'], audio_only, fresh=True)
             
             if not info:
-                print(f"{Fore.RED}Could not get video information{Style.RESET_ALL}")
+                _err("Could not get video information")
                 self.play_next_in_queue()
                 return
             
-            video_url = info.get('url')
-            if not video_url:
-                print(f"{Fore.RED}No stream URL found{Style.RESET_ALL}")
+            if not info.get('url'):
+                _err("No stream URL found")
                 self.play_next_in_queue()
                 return
             
-            # Use ffplay with better stream handling
-            ffplay_exe = self.ffplay_path if self.ffplay_path else 'ffplay'
-            cmd = [
-                ffplay_exe,
-                '-nodisp',
-                '-autoexit',
-                '-hide_banner',
-                '-loglevel', 'error',
-                '-nostats',
-                '-volume', str(self.volume),
-                '-protocol_whitelist', 'file,http,https,tcp,tls,crypto',
-                '-i', video_url
-            ]
-            
-            # Start ffplay process
-            self.current_process = subprocess.Popen(
-                cmd, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            self.is_playing = True
-            
-            # Start a thread to monitor the process
-            def monitor_playback():
-                try:
-                    # Check if process is valid before monitoring
-                    if not self.current_process:
-                        return
-                    
-                    # Wait for the process to complete naturally
-                    return_code = self.current_process.wait()
-                    
-                    # Get any error output for debugging
-                    stderr_output = self.current_process.stderr.read() if self.current_process and self.current_process.stderr else ""
-                    
-                    # Only play next if we're still supposed to be playing
-                    if self.is_playing and return_code == 0:
-                        self.play_next_in_queue()
-                    elif return_code != 0:
-                        print(f"{Fore.YELLOW}Track ended unexpectedly (code: {return_code}){Style.RESET_ALL}")
-                        if stderr_output:
-                            print(f"{Fore.YELLOW}Error: {stderr_output.strip()}{Style.RESET_ALL}")
-                        if self.is_playing:
-                            self.play_next_in_queue()
-                            
-                except Exception as e:
-                    if self.is_playing:
-                        print(f"{Fore.YELLOW}Playback interrupted: {e}{Style.RESET_ALL}")
-                        self.play_next_in_queue()
-            
-            self.player_thread = threading.Thread(target=monitor_playback, daemon=True)
-            self.player_thread.start()
+            self._spawn_ffplay(info)
             
         except Exception as e:
-            print(f"{Fore.RED}Error playing track: {e}{Style.RESET_ALL}")
+            _err(f"Error playing track: {e}")
             self.play_next_in_queue()
     
+    def _spawn_ffplay(self, info):
+        """Start ffplay on a resolved stream and monitor it in the background"""
+        video_url = info['url']
+        protocol = info.get('protocol') or ''
+        
+        # Plain HTTP(S) streams are fed through stdin so ffplay doesn't open a
+        # second connection. HLS playlists go straight to ffplay, which
+        # fetches the segments itself with the headers yt-dlp resolved them
+        # with. Only DASH segment lists, which ffplay can't read, fall back to
+        # a yt-dlp process reassembling them into ffplay's stdin
+        pipe_stream = protocol in ('http', 'https')
+        feeder = self._start_ytdlp_feeder(info) if protocol.startswith('http_dash') else None
+        source = 'pipe:0' if pipe_stream or feeder else video_url
+        
+        # Use ffplay with better stream handling; only volume and input vary.
+        # Formats with a video track (audio_only=False) get a display window
+        has_video = info.get('vcodec') not in (None, 'none')
+        prefix = self._ffplay_video_cmd if has_video else self._ffplay_cmd
+        headers = info.get('http_headers') if source == video_url else None
+        if headers:
+            header_args = ('-headers', ''.join(f"{k}: {v}\r\n" for k, v in headers.items()))
+        else:
+            header_args = ()
+        cmd = prefix + ('-volume', self._volume_str) + header_args + ('-i', source)
+        
+        # Start ffplay process
+        try:
+            self.current_process = self._launch(cmd, pipe_stream, feeder[0].stdout.fileno() if feeder else None)
+        except Exception:
+            self._stop_feeder(feeder)
+            raise
+        if feeder:
+            feeder[0].stdout.close()  # ffplay holds the read end now
+        if pipe_stream:
+            threading.Thread(
+                target=self._feed_stream,
+                args=(self.current_process, video_url, info.get('http_headers')),
+                daemon=True
+            ).start()
+        self._autoplay = True
+        self._monitor(self.current_process, feeder)
+    
+    def _monitor(self, process, feeder):
+        """Hand a started track to the monitor thread, starting it on first use"""
+        if self.player_thread is None:
+            self.player_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            self.player_thread.start()
+        self._monitor_jobs.put((process, feeder))
+    
+    def _monitor_loop(self):
+        """Wait on each started track in turn; ending one may start and enqueue the next"""
+        while True:
+            process, feeder = self._monitor_jobs.get()
+            self._watch_track(process, feeder)
+    
+    def _watch_track(self, process, feeder):
+        """Wait for a track's ffplay to exit, then report errors and advance the queue"""
+        try:
+            # Wait for the process to complete naturally
+            return_code = process.wait()
+            self._stop_feeder(feeder)
+            
+            with process.stderr:
+                # A stopped or skipped track is not an error, and a skip has
+                # already started the next one
+                if not self._autoplay or process is not self.current_process:
+                    return
+                
+                if return_code != 0:
+                    # Get the tail of any error output for debugging; the
+                    # last messages explain the exit, and the file is unbounded
+                    size = process.stderr.seek(0, os.SEEK_END)
+                    process.stderr.seek(max(0, size - _STDERR_TAIL))
+                    stderr_output = process.stderr.read().decode(errors='replace')
+                    _warn(f"Track ended unexpectedly (code: {return_code})")
+                    if stderr_output:
+                        _warn(f"Error: {stderr_output.strip()}")
+            self.play_next_in_queue()
+                    
+        except Exception as e:
+            if self._autoplay and process is self.current_process:
+                _warn(f"Playback interrupted: {e}")
+                self.play_next_in_queue()
+    
+    def _start_ytdlp_feeder(self, info):
+        """Start a yt-dlp process writing an already resolved format to its stdout
+        
+        Fallback for DASH segment lists only: the child pays for its own
+        interpreter start and connections. Returns (process, info_json_path);
+        the resolved info is handed over as a private temp JSON file, removed
+        by _stop_feeder, so the child doesn't repeat the extraction.
+        """
+        with tempfile.NamedTemporaryFile('w', suffix='.info.json', delete=False, encoding='utf-8') as f:
+            json.dump(_get_ytdlp().YoutubeDL.sanitize_info(info), f)
+        cmd = [
+            sys.executable, '-m', 'yt_dlp', '--quiet', '--no-warnings',
+            '--load-info-json', f.name, '-f', info.get('format_id') or 'best', '-o', '-'
+        ]
+        try:
+            if not hasattr(os, 'posix_spawnp'):
+                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                           bufsize=io.DEFAULT_BUFFER_SIZE)
+                return process, f.name
+            
+            # Same reasoning as _launch: forking the yt-dlp-laden parent for a
+            # child that immediately execs is wasted page-table copying
+            if self._devnull_fd is None:
+                self._devnull_fd = os.open(os.devnull, os.O_RDWR)
+            read_fd, write_fd = os.pipe()
+            try:
+                pid = os.posix_spawnp(cmd[0], cmd, os.environ, file_actions=[
+                    (os.POSIX_SPAWN_DUP2, write_fd, 1),
+                    (os.POSIX_SPAWN_DUP2, self._devnull_fd, 2),
+                ])
+            except OSError:
+                os.close(read_fd)
+                raise
+            finally:
+                os.close(write_fd)
+        except Exception:
+            os.remove(f.name)
+            raise
+        process = _SpawnedProcess(pid, cmd)
+        process.stdout = os.fdopen(read_fd, 'rb')
+        return process, f.name
+    
+    def _stop_feeder(self, feeder):
+        """Stop a yt-dlp feeder process and remove its info file"""
+        if not feeder:
+            return
+        process, info_path = feeder
+        if process.poll() is None:
+            self._terminate(process)
+        try:
+            os.remove(info_path)
+        except OSError:
+            pass
+    
+    def _launch(self, cmd, pipe_stdin=False, stdin_fd=None):
+        """Start ffplay, via posix_spawn where available to avoid a full fork
+        
+        pipe_stdin gives ffplay a pipe exposed as process.stdin; stdin_fd
+        instead connects an existing descriptor, such as a feeder's stdout.
+        """
+        # ffplay's stderr goes to an unlinked temp file rather than a pipe, so
+        # nothing has to drain it while playing; it is read only on failure
+        stderr_file = tempfile.TemporaryFile()
+        if not hasattr(os, 'posix_spawnp'):
+            try:
+                process = subprocess.Popen(
+                    cmd, 
+                    stdin=subprocess.PIPE if pipe_stdin else stdin_fd,
+                    stdout=subprocess.DEVNULL, 
+                    stderr=stderr_file,
+                    bufsize=io.DEFAULT_BUFFER_SIZE
+                )
+            except Exception:
+                stderr_file.close()
+                raise
+            process.stderr = stderr_file
+            return process
+        
+        if self._devnull_fd is None:
+            self._devnull_fd = os.open(os.devnull, os.O_RDWR)
+        file_actions = [
+            (os.POSIX_SPAWN_DUP2, self._devnull_fd, 1),
+            (os.POSIX_SPAWN_DUP2, stderr_file.fileno(), 2),
+        ]
+        if pipe_stdin:
+            read_fd, write_fd = os.pipe()
+            file_actions.append((os.POSIX_SPAWN_DUP2, read_fd, 0))
+        elif stdin_fd is not None:
+            file_actions.append((os.POSIX_SPAWN_DUP2, stdin_fd, 0))
+        try:
+            # Python ignores SIGPIPE, which ffplay would otherwise inherit
+            pid = os.posix_spawnp(cmd[0], cmd, os.environ, file_actions=file_actions,
+                                  setsigdef=(signal.SIGPIPE,))
+        except OSError:
+            if pipe_stdin:
+                os.close(write_fd)
+            stderr_file.close()
+            raise
+        finally:
+            if pipe_stdin:
+                os.close(read_fd)
+        process = _SpawnedProcess(pid, cmd, os.fdopen(write_fd, 'wb') if pipe_stdin else None)
+        process.stderr = stderr_file
+        return process
+    
+    def _http_session(self):
+        """Get the shared HTTP session, so stream fetches reuse pooled connections"""
+        if self._http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+            session.headers.update(config.HTTP_HEADERS)
+            self._http = session
+        return self._http
+    
+    def _feed_stream(self, process, url, headers):
+        """Copy a stream from its direct URL into ffplay's stdin"""
+        import requests
+        try:
+            with self._http_session().get(url, headers=headers, stream=True, timeout=10) as response:
+                response.raise_for_status()
+                shutil.copyfileobj(response.raw, process.stdin, 1 << 16)
+        except (OSError, requests.RequestException):
+            pass  # ffplay was stopped or the stream dropped; the monitor reports it
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+    
     def display_search_results(self, results):
         """Display search results in a formatted way"""
         if not results:
-            print(f"{Fore.YELLOW}No results found{Style.RESET_ALL}")
+            _warn("No results found")
             return
         
-        print(f"\n{Fore.CYAN}Search Results:{Style.RESET_ALL}")
-        print("-" * 80)
-        
-        for i, video in enumerate(results[:10], 1):
+        buf = io.StringIO()
+        buf.write(f"\n{_CYAN}Search Results:{_RST}\n{'-' * 80}\n")
+        for i, video in enumerate(results[:config.MAX_SEARCH_RESULTS]):
             title = video.get('title', 'Unknown Title')
             duration = video.get('duration', 'Unknown')
             uploader = video.get('uploader', 'Unknown')
@@ -406,117 +855,128 @@ class U2BPlayer:
             if len(title) > 70:
                 title = title[:67] + "..."
             
-            print(f"{Fore.GREEN}{i:2d}.{Style.RESET_ALL} {title}")
-            print(f"    Duration: {duration}s | Uploader: {uploader}")
-            print()
+            buf.write(f"{_GREEN_IDX[i]} {title}\n    Duration: {duration}s | Uploader: {uploader}\n\n")
+        
+        # One write for the whole list instead of three prints per result
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
     
     def show_help(self):
         """Display help information"""
-        help_text = f"""
-{Fore.CYAN}u2b - YouTube Command Line Player{Style.RESET_ALL}
+        sys.stdout.write(_HELP_TEXT)
+        sys.stdout.flush()
 
-{Fore.GREEN}Commands:{Style.RESET_ALL}
-  <search term>     - Search and add to queue (or play if nothing is playing)
-  <youtube url>     - Add YouTube URL to queue (or play if nothing is playing)
-  volume <1-100>    - Set volume level
-  stop              - Stop current playback
-  queue             - Show current queue
-  clear             - Clear the queue
-  skip              - Skip current track
-  help              - Show this help
-  quit/exit         - Exit the application
+def _quit(player, tail, user_input):
+    """Stop everything and leave the REPL"""
+    player.close()
+    _info("Goodbye!")
+    return True
 
-{Fore.YELLOW}Examples:{Style.RESET_ALL}
-  never gonna give you up
-  https://www.youtube.com/watch?v=dQw4w9WgXcQ
-  volume 75
-  queue
-  skip
-  clear
+def _stop(player, tail, user_input):
+    """Stop the current track"""
+    player.stop_playback()
+    _warn("Playback stopped")
 
-{Fore.CYAN}Features:{Style.RESET_ALL}
-  - Audio-only playback (no ads)
-  - Smart queue system
-  - Volume control (1-100)
-  - Direct URL support
-  - Search functionality
-  - Continuous playback
-"""
-        print(help_text)
+def _volume(player, tail, user_input):
+    """Set the volume from the command's argument"""
+    try:
+        player.set_volume(int(tail.split()[0]))
+    except (IndexError, ValueError):
+        _err("Usage: volume <1-100>")
+
+def _init_history():
+    """Load REPL history and save it again on exit"""
+    if readline is None:
+        return
+    path = os.path.expanduser(config.HISTORY_FILE)
+    readline.set_history_length(config.HISTORY_LENGTH)
+    try:
+        readline.read_history_file(path)
+    except OSError:
+        pass  # No history yet
+    
+    def save_history():
+        try:
+            readline.write_history_file(path)
+        except OSError:
+            pass
+    atexit.register(save_history)
+
+# REPL commands keyed on the lowercased first word. Handlers get the player, the
+# rest of the line (case preserved) and the full input; returning True exits
+_DISPATCH = {
+    'quit': _quit,
+    'exit': _quit,
+    'help': lambda p, t, o: p.show_help(),
+    'stop': _stop,
+    'queue': lambda p, t, o: p.show_queue(),
+    'clear': lambda p, t, o: p.clear_queue(),
+    'skip': lambda p, t, o: p.skip_current(),
+    'volume': _volume,
+}
+_ARG_COMMANDS = {'volume'}
 
 def main():
     """Main application loop"""
+    _init_colors()
+    _init_history()
     player = U2BPlayer()
     
-    print(f"{Fore.CYAN}Welcome to u2b - YouTube Command Line Player{Style.RESET_ALL}")
-    print(f"{Fore.YELLOW}Type 'help' for commands or 'quit' to exit{Style.RESET_ALL}")
+    _info("Welcome to u2b - YouTube Command Line Player")
+    _warn("Type 'help' for commands or 'quit' to exit")
     print()
     
     while True:
         try:
             # Get user input
-            user_input = input(f"{Fore.GREEN}u2b> {Style.RESET_ALL}").strip()
+            user_input = input(_PROMPT).strip()
             
             if not user_input:
                 continue
             
-            # Handle commands
-            if user_input.lower() in ['quit', 'exit']:
-                player.stop_playback()
-                print(f"{Fore.CYAN}Goodbye!{Style.RESET_ALL}")
-                break
-            
-            elif user_input.lower() == 'help':
-                player.show_help()
+            # A new command supersedes prefetches that haven't started yet
+            player.cancel_prefetch()
             
-            elif user_input.lower() == 'stop':
-                player.stop_playback()
-                print(f"{Fore.YELLOW}Playback stopped{Style.RESET_ALL}")
-            
-            elif user_input.lower() == 'queue':
-                player.show_queue()
-            
-            elif user_input.lower() == 'clear':
-                player.clear_queue()
-            
-            elif user_input.lower() == 'skip':
-                player.skip_current()
-            
-            elif user_input.lower().startswith('volume '):
-                try:
-                    volume = int(user_input.split()[1])
-                    player.set_volume(volume)
-                except (IndexError, ValueError):
-                    print(f"{Fore.RED}Usage: volume <1-100>{Style.RESET_ALL}")
+            # Handle commands
+            head, _, tail = user_input.partition(' ')
+            head = head.lower()
+            handler = _DISPATCH.get(head)
+            # Only commands that take an argument may be followed by more
+            # words; anything else (e.g. "help me rhonda") is a search
+            if handler and (not tail or head in _ARG_COMMANDS):
+                if handler(player, tail, user_input):
+                    break
             
             elif user_input.startswith('http'):
-                # Direct URL
-                video_id = player.extract_video_id(user_input)
+                # Direct URL: one (memoized) regex pass validates it and yields the
+                # ID, which goes to yt-dlp as a ready-made entry (no URL matching)
+                video_id = U2BPlayer.extract_video_id(user_input)
                 if video_id:
-                    player.play_video(user_input)
+                    player.play_video({'_type': 'url', 'ie_key': 'Youtube', 'id': video_id, 'url': user_input})
                 else:
-                    print(f"{Fore.RED}Invalid YouTube URL{Style.RESET_ALL}")
+                    _err("Invalid YouTube URL")
             
             else:
                 # Search query
-                print(f"{Fore.YELLOW}Searching for: {user_input}{Style.RESET_ALL}")
+                _warn(f"Searching for: {user_input}")
                 results = player.search_youtube(user_input)
                 
                 if results:
-                    # Add the first result to queue or play if nothing is playing
+                    # Add the first result to queue or play if nothing is playing;
+                    # its stream is already being resolved in the background
                     first_video = results[0]
-                    video_url = f"https://www.youtube.com/watch?v={first_video['id']}"
-                    player.play_video(video_url)
+                    _info(f"Found: {first_video.get('title', 'Unknown')}")
+                    player.play_video(first_video, audio_only=True)
                 else:
-                    print(f"{Fore.RED}No videos found for: {user_input}{Style.RESET_ALL}")
+                    _err(f"No videos found for: {user_input}")
         
         except KeyboardInterrupt:
-            print(f"\n{Fore.YELLOW}Interrupted by user{Style.RESET_ALL}")
-            player.stop_playback()
+            _warn("\nInterrupted by user")
+            player.close()
             break
         
         except Exception as e:
-            print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
+            _err(f"Error: {e}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
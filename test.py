@@ -12,7 +12,6 @@ def test_imports():
     required_modules = [
         'yt_dlp',
         'requests',
-        'bs4',
         'colorama'
     ]
     
@@ -49,8 +48,8 @@ def test_ffmpeg():
     """Test if FFmpeg is available"""
     import subprocess
     try:
-        result = subprocess.run(['ffplay', '-version'], 
-                              capture_output=True, text=True, timeout=5)
+        result = subprocess.run(['ffplay', '-version'], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, timeout=5, check=False)
         if result.returncode == 0:
             print("✓ FFmpeg detected")
             return True
@@ -60,6 +59,30 @@ def test_ffmpeg():
     print("✗ FFmpeg not found")
     return False
 
+def test_video_ids():
+    """Test that YouTube URLs are recognized and lookalike hosts rejected"""
+    from main import U2BPlayer
+    cases = [
+        ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'dQw4w9WgXcQ'),
+        ('https://youtube.com/watch?list=PL1&v=dQw4w9WgXcQ', 'dQw4w9WgXcQ'),
+        ('https://m.youtube.com/shorts/dQw4w9WgXcQ', 'dQw4w9WgXcQ'),
+        ('https://youtu.be/dQw4w9WgXcQ', 'dQw4w9WgXcQ'),
+        ('www.youtube.com/embed/dQw4w9WgXcQ', 'dQw4w9WgXcQ'),
+        ('https://notyoutube.com/watch?v=dQw4w9WgXcQ', None),
+        ('https://youtube.com.evil.example/watch?v=dQw4w9WgXcQ', None),
+        ('https://evil.example/?next=youtu.be/dQw4w9WgXcQ', None),
+        ('https://www.youtube.com/watch?v=short', None),
+    ]
+    
+    failed = [url for url, expected in cases if U2BPlayer.extract_video_id(url) != expected]
+    for url in failed:
+        print(f"✗ {url}")
+    if failed:
+        return False
+    
+    print(f"✓ {len(cases)} URLs parsed as expected")
+    return True
+
 def main():
     """Run all tests"""
     print("u2b - Dependency Test")
@@ -68,7 +91,8 @@ def main():
     tests = [
         ("Module Imports", test_imports),
         ("Configuration", test_config),
-        ("FFmpeg", test_ffmpeg)
+        ("FFmpeg", test_ffmpeg),
+        ("Video IDs", test_video_ids)
     ]
     
     passed = 0